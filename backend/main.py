@@ -1,18 +1,69 @@
 import os
-import io
-from typing import Optional
+import math
+import asyncio
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+import numpy as np
+import tiktoken
+from sentence_transformers import SentenceTransformer
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-import pdfplumber
-import requests
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+import pypdfium2 as pdfium
+import httpx
 from bs4 import BeautifulSoup
+import soupsieve
+from cachetools import LRUCache, TTLCache
 from tenacity import retry, stop_after_attempt, wait_random_exponential, retry_if_exception
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 load_dotenv()
 
-app = FastAPI()
+def _available_cpus() -> int:
+    """CPUs this process may use, honouring affinity masks and cgroup v2 CPU quotas"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+# PDF parsing is CPU-bound; run it in worker processes so it doesn't hold the GIL.
+# Every uvicorn worker has its own pool, so the CPUs are split between workers unless
+# PDF_WORKERS is set explicitly.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS") or max(1, _available_cpus() // int(os.getenv("WEB_CONCURRENCY") or "1")))
+EXECUTOR = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+
+# Outbound HTTP reuses pooled keep-alive connections instead of a new TLS handshake per call.
+# OpenAI-compatible clients are kept per (api_key, base_url, headers) for the same reason.
+HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+OPENAI_CLIENTS: dict = {}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global HTTP_CLIENT
+    HTTP_CLIENT = httpx.AsyncClient()
+    try:
+        yield
+    finally:
+        for client in OPENAI_CLIENTS.values():
+            await client.close()
+        OPENAI_CLIENTS.clear()
+        await HTTP_CLIENT.aclose()
+        EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -24,50 +75,163 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def get_openai_client(api_key: str, base_url: str, headers: Optional[dict] = None) -> AsyncOpenAI:
+    """Return a shared AsyncOpenAI client for the given provider configuration"""
+    key = (api_key, base_url, tuple(sorted(headers.items())) if headers else None)
+    client = OPENAI_CLIENTS.get(key)
+    if client is None:
+        client = OPENAI_CLIENTS[key] = AsyncOpenAI(api_key=api_key, base_url=base_url, default_headers=headers)
+    return client
+
+LINKEDIN_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Common LinkedIn job description containers, combined and compiled once so each page's
+# DOM is walked a single time
+JOB_DESCRIPTION_SELECTOR = soupsieve.compile(', '.join([
+    'div.description__text',
+    'div.show-more-less-html__markup',
+    'section.description',
+    'div[class*="description"]',
+    'div[class*="job-description"]',
+]))
+
+# Cap concurrent LinkedIn requests (e.g. from bulk generation); bursts from one IP get
+# rate-limited or blocked
+LINKEDIN_FETCH_SEMAPHORE = asyncio.Semaphore(4)
+
+# Job posts rarely change within the hour; cache scraped descriptions by URL
+JOB_DESCRIPTION_CACHE = TTLCache(maxsize=1024, ttl=3600)
+JOB_DESCRIPTION_CACHE_LOCK = threading.RLock()
+
+# Users often re-upload the same CV with a different job URL; cache its extracted text
+# by the SHA-256 of the PDF bytes
+CV_TEXT_CACHE = LRUCache(maxsize=128)
+CV_CACHE_LOCK = threading.RLock()
+
+# Input tokens drive LLM latency and cost; cap each part of the prompt. cl100k_base is an
+# approximation for non-OpenAI providers, which is fine for a budget.
+# The encoding is downloaded on first use (the Docker image pre-bakes it) rather than at
+# import; if it can't be loaded, budgets fall back to an estimate of ~4 characters per token.
+TOKENIZER: Optional[tiktoken.Encoding] = None
+TOKENIZER_LOCK = threading.Lock()
+CHARS_PER_TOKEN = 4
+CV_TOKEN_BUDGET = 3000
+JOB_DESCRIPTION_TOKEN_BUDGET = 1500
+
+SYSTEM_MESSAGE = "You are an expert resume writer and LaTeX specialist."
+
+PROMPT_TEMPLATE = """You are an expert resume writer and LaTeX specialist. Your task is to create a tailored, professional resume in LaTeX format.
+
+**FULL CV CONTENT:**
+{cv_text}
+
+**JOB DESCRIPTION:**
+{job_description}
+
+**INSTRUCTIONS:**
+1. Analyze the job description and identify key requirements, skills, and qualifications
+2. Use the FULL CV content as your source material
+3. Emphasize and prioritize experiences, skills, and achievements that match the job requirements
+4. Reorganize and reword bullet points to align with the job description keywords
+5. Keep the resume concise (1-2 pages maximum)
+6. Output ONLY valid LaTeX code - no explanations, no markdown, no comments
+7. Use a clean, professional LaTeX resume template
+8. Include sections: Contact Info, Summary/Objective, Experience, Education, Skills, and any other relevant sections from the CV
+
+**OUTPUT REQUIREMENTS:**
+- Return ONLY the complete LaTeX document code
+- Start with \\documentclass and end with \\end{{document}}
+- Use standard LaTeX packages (geometry, enumitem, hyperref, etc.)
+- Make it compile-ready
+- NO markdown code blocks, NO explanations, NO preamble
+- Just pure LaTeX code"""
+
+# Characters held back while streaming so a closing markdown fence can be stripped
+FENCE_HOLDBACK = 16
+
+# Bulk generation goes through the OpenAI Batch API (half price, separate rate limits)
+MAX_BATCH_JOB_URLS = 50
+
+# Semantic cache: reuse generated LaTeX for the same CV and a near-identical job description.
+# Entries are scoped to the exact CV (by PDF hash) so one user's resume is never served to
+# another; only the job description is matched by embedding similarity. Embeddings are
+# computed locally; texts are split into chunks first so the model's input limit doesn't
+# silently truncate them.
+# The model is loaded on first use (always off the event loop) rather than at import.
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+EMBEDDING_MODEL: Optional[SentenceTransformer] = None
+EMBEDDING_MODEL_LOCK = threading.Lock()
+TEXT_SPLITTER = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50, length_function=len)
+# Resumes and job posts repeat boilerplate (contact blocks, headings, company blurbs); keep
+# chunk embeddings keyed by a short content hash so repeated chunks aren't re-encoded
+CHUNK_EMBEDDING_CACHE = LRUCache(maxsize=4096)
+CHUNK_EMBEDDING_CACHE_LOCK = threading.RLock()
+SEMANTIC_CACHE_THRESHOLD = 0.97
+SEMANTIC_CACHE_MAXSIZE = 256
+# The cache is tiny, so a brute-force matmul beats any index. Unused rows stay zero and
+# can never clear the threshold; entries map row -> LaTeX in least-recently-used order.
+# Rows are stored as int8 with a per-row scale (a quarter of float32's memory); scores
+# are accumulated in int32 and rescaled.
+SEMANTIC_CACHE_VECS = np.zeros((SEMANTIC_CACHE_MAXSIZE, EMBEDDING_DIM), dtype=np.int8)
+SEMANTIC_CACHE_SCALES = np.ones(SEMANTIC_CACHE_MAXSIZE, dtype=np.float32)
+SEMANTIC_CACHE_CV_HASHES = np.full(SEMANTIC_CACHE_MAXSIZE, "", dtype=object)
+SEMANTIC_CACHE_ENTRIES: "OrderedDict[int, str]" = OrderedDict()
+SEMANTIC_CACHE_LOCK = threading.RLock()
+
 # Hugging Face configuration is provided per-request via env vars
 
 def extract_text_from_pdf(pdf_file: bytes) -> str:
     """Extract text from uploaded PDF file"""
     text = ""
-    with pdfplumber.open(io.BytesIO(pdf_file)) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
+    pdf = pdfium.PdfDocument(pdf_file)
+    try:
+        for page in pdf:
+            # PDFium separates lines with \r\n; normalize to \n as pdfplumber did
+            page_text = page.get_textpage().get_text_range().replace("\r\n", "\n")
             if page_text:
                 text += page_text + "\n\n"
+    finally:
+        pdf.close()
+    return text
+
+async def extract_cv_text(pdf_content: bytes, cv_hash: str) -> str:
+    """Extract CV text in the process pool, reusing the result for previously seen PDFs"""
+    with CV_CACHE_LOCK:
+        cached = CV_TEXT_CACHE.get(cv_hash)
+    if cached is not None:
+        return cached
+
+    text = await asyncio.get_running_loop().run_in_executor(EXECUTOR, extract_text_from_pdf, pdf_content)
+    with CV_CACHE_LOCK:
+        CV_TEXT_CACHE[cv_hash] = text
     return text
 
-def fetch_linkedin_job_description(url: str) -> str:
+async def fetch_linkedin_job_description(url: str) -> str:
     """
     Fetch job description from LinkedIn URL
     Note: LinkedIn has anti-scraping measures. This is a basic implementation.
     For production, consider using LinkedIn API or browser automation.
     """
+    with JOB_DESCRIPTION_CACHE_LOCK:
+        cached = JOB_DESCRIPTION_CACHE.get(url)
+    if cached is not None:
+        return cached
+
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+        async with LINKEDIN_FETCH_SEMAPHORE:
+            response = await HTTP_CLIENT.get(url, headers=LINKEDIN_HEADERS, timeout=10, follow_redirects=True)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(response.text, 'lxml')
         
         # Try to find job description in common LinkedIn selectors
         job_desc = ""
-        
-        # Look for description in various possible containers
-        selectors = [
-            'div.description__text',
-            'div.show-more-less-html__markup',
-            'section.description',
-            'div[class*="description"]',
-            'div[class*="job-description"]'
-        ]
-        
-        for selector in selectors:
-            elements = soup.select(selector)
-            if elements:
-                job_desc = elements[0].get_text(separator='\n', strip=True)
-                break
+        element = JOB_DESCRIPTION_SELECTOR.select_one(soup)
+        if element:
+            job_desc = element.get_text(separator='\n', strip=True)
         
         # Fallback: get all text if specific selectors don't work
         if not job_desc:
@@ -76,123 +240,321 @@ def fetch_linkedin_job_description(url: str) -> str:
             if main_content:
                 job_desc = main_content.get_text(separator='\n', strip=True)
         
-        return job_desc if job_desc else "Could not extract job description. Please check the URL."
+        if not job_desc:
+            return "Could not extract job description. Please check the URL."
+
+        with JOB_DESCRIPTION_CACHE_LOCK:
+            JOB_DESCRIPTION_CACHE[url] = job_desc
+        return job_desc
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to fetch job description: {str(e)}")
 
-def generate_latex_resume(cv_text: str, job_description: str) -> str:
+def get_embedding_model() -> SentenceTransformer:
+    """Load the local embedding model once, on first use"""
+    global EMBEDDING_MODEL
+    with EMBEDDING_MODEL_LOCK:
+        if EMBEDDING_MODEL is None:
+            EMBEDDING_MODEL = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        return EMBEDDING_MODEL
+
+def _mean_pool(vecs: np.ndarray) -> np.ndarray:
+    """Collapse normalized chunk embeddings into one normalized vector"""
+    vec = vecs.mean(axis=0)
+    return vec / np.linalg.norm(vec)
+
+def _encode_chunks(chunks: List[str]) -> np.ndarray:
+    """Encode chunks in one batch, reusing embeddings of chunks seen before"""
+    keys = [hashlib.blake2b(chunk.encode("utf-8"), digest_size=8).digest() for chunk in chunks]
+    with CHUNK_EMBEDDING_CACHE_LOCK:
+        known = {key: CHUNK_EMBEDDING_CACHE[key] for key in keys if key in CHUNK_EMBEDDING_CACHE}
+
+    # One entry per hash, so duplicates within the request are encoded once too
+    missing = {key: chunk for key, chunk in zip(keys, chunks) if key not in known}
+    if missing:
+        vecs = get_embedding_model().encode(list(missing.values()), batch_size=32, normalize_embeddings=True)
+        encoded = dict(zip(missing.keys(), vecs))
+        with CHUNK_EMBEDDING_CACHE_LOCK:
+            CHUNK_EMBEDDING_CACHE.update(encoded)
+        known.update(encoded)
+
+    return np.stack([known[key] for key in keys])
+
+def embed_job_description(job_description: str) -> np.ndarray:
+    """Embed a job description as a single normalized vector for the semantic cache"""
+    chunks = TEXT_SPLITTER.split_text(job_description) or [job_description]
+    return _mean_pool(_encode_chunks(chunks)).astype(np.float32)
+
+def _quantize(vec: np.ndarray) -> tuple:
+    """Symmetric int8 quantization scaled so the largest component maps to 127"""
+    scale = 127.0 / max(float(np.abs(vec).max()), 1e-12)
+    return np.round(vec * scale).astype(np.int8), np.float32(scale)
+
+def _semantic_cache_match(cv_hash: str, vec: np.ndarray) -> Optional[int]:
+    """Slot of this CV's nearest cached job description, if similar enough; caller holds the lock"""
+    query, query_scale = _quantize(vec)
+    # Rows fill contiguously until the cache is full, so only search the occupied ones
+    size = len(SEMANTIC_CACHE_ENTRIES)
+    slots = np.flatnonzero(SEMANTIC_CACHE_CV_HASHES[:size] == cv_hash)
+    if slots.size == 0:
+        return None
+    scores = np.matmul(SEMANTIC_CACHE_VECS[slots], query, dtype=np.int32) / (SEMANTIC_CACHE_SCALES[slots] * query_scale)
+    best = int(np.argmax(scores))
+    if scores[best] < SEMANTIC_CACHE_THRESHOLD:
+        return None
+    return int(slots[best])
+
+def semantic_cache_lookup(cv_hash: str, vec: np.ndarray) -> Optional[str]:
+    """Return cached LaTeX for this CV and the nearest previous job description, if similar enough"""
+    with SEMANTIC_CACHE_LOCK:
+        slot = _semantic_cache_match(cv_hash, vec)
+        if slot is None:
+            return None
+        SEMANTIC_CACHE_ENTRIES.move_to_end(slot)
+        return SEMANTIC_CACHE_ENTRIES[slot]
+
+def semantic_cache_has_cv(cv_hash: str) -> bool:
+    """Whether any cached entry belongs to this CV"""
+    with SEMANTIC_CACHE_LOCK:
+        size = len(SEMANTIC_CACHE_ENTRIES)
+        return bool((SEMANTIC_CACHE_CV_HASHES[:size] == cv_hash).any())
+
+async def embed_for_semantic_cache(job_description: str) -> Optional[np.ndarray]:
+    """Embed a job description off the event loop; embedding failures just bypass the cache"""
+    try:
+        return await asyncio.to_thread(embed_job_description, job_description)
+    except Exception as e:
+        print(f"[DEBUG] Semantic cache disabled for this request: {type(e).__name__}: {str(e)[:200]}")
+        return None
+
+def semantic_cache_add(cv_hash: str, vec: np.ndarray, latex_code: str) -> None:
+    """Store generated LaTeX, evicting the least recently used entries beyond the size bound"""
+    with SEMANTIC_CACHE_LOCK:
+        # A regenerate (use_cache=false) replaces the draft it would have matched rather
+        # than adding a duplicate row that lookups would never prefer
+        slot = _semantic_cache_match(cv_hash, vec)
+        if slot is not None:
+            SEMANTIC_CACHE_ENTRIES.move_to_end(slot)
+        elif len(SEMANTIC_CACHE_ENTRIES) >= SEMANTIC_CACHE_MAXSIZE:
+            slot, _ = SEMANTIC_CACHE_ENTRIES.popitem(last=False)
+        else:
+            slot = len(SEMANTIC_CACHE_ENTRIES)
+        SEMANTIC_CACHE_VECS[slot], SEMANTIC_CACHE_SCALES[slot] = _quantize(vec)
+        SEMANTIC_CACHE_CV_HASHES[slot] = cv_hash
+        SEMANTIC_CACHE_ENTRIES[slot] = latex_code
+
+def get_tokenizer() -> Optional[tiktoken.Encoding]:
+    """Load the cl100k_base encoding once, on first use; None if it isn't available"""
+    global TOKENIZER
+    with TOKENIZER_LOCK:
+        if TOKENIZER is None:
+            try:
+                TOKENIZER = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                print(f"[DEBUG] Tokenizer unavailable, estimating tokens from characters: {type(e).__name__}: {str(e)[:200]}")
+        return TOKENIZER
+
+def truncate_to_token_budget(text: str, budget: int) -> str:
+    """Trim text to at most `budget` tokens"""
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return text[:budget * CHARS_PER_TOKEN]
+    tokens = tokenizer.encode(text)
+    if len(tokens) <= budget:
+        return text
+    return tokenizer.decode(tokens[:budget])
+
+def build_prompt(cv_text: str, job_description: str) -> str:
+    """Fill the resume prompt template; callers truncate inputs to their token budgets first"""
+    return PROMPT_TEMPLATE.format(cv_text=cv_text, job_description=job_description)
+
+def _strip_leading_fence(text: str) -> str:
+    return text.lstrip().removeprefix("```latex").removeprefix("```").lstrip()
+
+def _strip_trailing_fence(text: str) -> str:
+    return text.rstrip().removesuffix("```").rstrip()
+
+def strip_code_fences(latex_code: str) -> str:
+    """Remove markdown code fences the model may wrap around the LaTeX"""
+    return _strip_trailing_fence(_strip_leading_fence(latex_code))
+
+async def _strip_code_fences_stream(pieces: AsyncIterator[str]) -> AsyncIterator[str]:
     """
-    Generate adapted LaTeX resume using selected provider with fallbacks.
-    Supported providers: huggingface, openai, deepseek, grok (xAI). Configure with env vars.
+    Remove markdown code fences the model may wrap around the LaTeX, while streaming.
+    The head is buffered until a leading fence can be ruled out, and a short tail is
+    held back so a closing fence can be dropped once the stream ends.
     """
+    buffer = ""
+    head_checked = False
+    async for piece in pieces:
+        buffer += piece
+        if not head_checked:
+            if len(buffer.lstrip()) <= FENCE_HOLDBACK:
+                continue
+            buffer = _strip_leading_fence(buffer)
+            head_checked = True
+        if len(buffer) > FENCE_HOLDBACK:
+            yield buffer[:-FENCE_HOLDBACK]
+            buffer = buffer[-FENCE_HOLDBACK:]
 
-    prompt = f"""You are an expert resume writer and LaTeX specialist. Your task is to create a tailored, professional resume in LaTeX format.
+    if not head_checked:
+        buffer = _strip_leading_fence(buffer)
+    buffer = _strip_trailing_fence(buffer)
+    if buffer:
+        yield buffer
 
-**FULL CV CONTENT:**
-{cv_text}
+def _is_rate_limit_error(exc: Exception) -> bool:
+    msg = str(exc).upper()
+    # Consider typical transient conditions (rate limit, model loading, 5xx)
+    return (
+        "429" in msg
+        or "503" in msg
+        or "RATE" in msg
+        or "QUOTA" in msg
+        or "MODEL IS CURRENTLY LOADING" in msg
+        or "PLEASE TRY AGAIN" in msg
+    )
 
-**JOB DESCRIPTION:**
-{job_description}
+def _parse_huggingface_reply(resp: httpx.Response) -> str:
+    """Extract the generated text from a non-streamed Inference API reply"""
+    try:
+        data = resp.json()
+    except Exception:
+        # Fallback to raw text
+        return (resp.text or "").strip()
 
-**INSTRUCTIONS:**
-1. Analyze the job description and identify key requirements, skills, and qualifications
-2. Use the FULL CV content as your source material
-3. Emphasize and prioritize experiences, skills, and achievements that match the job requirements
-4. Reorganize and reword bullet points to align with the job description keywords
-5. Keep the resume concise (1-2 pages maximum)
-6. Output ONLY valid LaTeX code - no explanations, no markdown, no comments
-7. Use a clean, professional LaTeX resume template
-8. Include sections: Contact Info, Summary/Objective, Experience, Education, Skills, and any other relevant sections from the CV
+    # Response formats: list of {generated_text: ...} or dicts
+    if isinstance(data, list) and data and isinstance(data[0], dict) and "generated_text" in data[0]:
+        return (data[0]["generated_text"] or "").strip()
+    if isinstance(data, dict) and "generated_text" in data:
+        return (data["generated_text"] or "").strip()
 
-**OUTPUT REQUIREMENTS:**
-- Return ONLY the complete LaTeX document code
-- Start with \\documentclass and end with \\end{{document}}
-- Use standard LaTeX packages (geometry, enumitem, hyperref, etc.)
-- Make it compile-ready
-- NO markdown code blocks, NO explanations, NO preamble
-- Just pure LaTeX code"""
+    # Some models return a list of tokens or alternative fields; fallback to string conversion
+    return (str(data) or "").strip()
 
-    def _is_rate_limit_error(exc: Exception) -> bool:
-        msg = str(exc).upper()
-        # Consider typical transient conditions (rate limit, model loading, 5xx)
-        return (
-            "429" in msg
-            or "503" in msg
-            or "RATE" in msg
-            or "QUOTA" in msg
-            or "MODEL IS CURRENTLY LOADING" in msg
-            or "PLEASE TRY AGAIN" in msg
-        )
+@retry(
+    retry=retry_if_exception(_is_rate_limit_error),
+    wait=wait_random_exponential(multiplier=2, max=60),
+    stop=stop_after_attempt(5),
+    reraise=True,
+)
+async def _stream_with_huggingface(p: str) -> AsyncIterator[str]:
+    hf_api_key = os.getenv("HUGGINGFACE_API_KEY")
+    model_id = os.getenv("HUGGINGFACE_MODEL", "nvidia/NVIDIA-Nemotron-3-Nano-30B-A3B-BF16")
+    if not hf_api_key:
+        raise RuntimeError("HUGGINGFACE_API_KEY is not set")
 
-    @retry(
-        retry=retry_if_exception(_is_rate_limit_error),
-        wait=wait_random_exponential(multiplier=2, max=60),
-        stop=stop_after_attempt(5),
-        reraise=True,
-    )
-    def _generate_with_huggingface(p: str):
-        hf_api_key = os.getenv("HUGGINGFACE_API_KEY")
-        model_id = os.getenv("HUGGINGFACE_MODEL", "nvidia/NVIDIA-Nemotron-3-Nano-30B-A3B-BF16")
-        if not hf_api_key:
-            raise RuntimeError("HUGGINGFACE_API_KEY is not set")
-
-        url = f"https://router.huggingface.co/models/{model_id}"
-        headers = {
-            "Authorization": f"Bearer {hf_api_key}",
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-        }
-        payload = {
-            "inputs": p,
-            "parameters": {
-                "max_new_tokens": int(os.getenv("HF_MAX_NEW_TOKENS", "900")),
-                "temperature": float(os.getenv("HF_TEMPERATURE", "0.7")),
-                "return_full_text": False,
-            },
-        }
+    url = f"https://router.huggingface.co/models/{model_id}"
+    headers = {
+        "Authorization": f"Bearer {hf_api_key}",
+        "Accept": "text/event-stream",
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "inputs": p,
+        "parameters": {
+            "max_new_tokens": int(os.getenv("HF_MAX_NEW_TOKENS", "900")),
+            "temperature": float(os.getenv("HF_TEMPERATURE", "0.7")),
+            "return_full_text": False,
+        },
+        "stream": True,
+    }
 
-        resp = requests.post(url, headers=headers, json=payload, timeout=90)
+    request = HTTP_CLIENT.build_request("POST", url, headers=headers, json=payload, timeout=90)
+    resp = await HTTP_CLIENT.send(request, stream=True)
+    if not resp.is_success:
+        await resp.aread()
+        await resp.aclose()
         # Handle common transient statuses
         if resp.status_code in (429, 503):
             # Bubble up for retry/backoff
             raise RuntimeError(f"HuggingFace transient error: {resp.status_code} {resp.text}")
-        if not resp.ok:
-            # Non-retryable error
-            raise HTTPException(status_code=resp.status_code, detail=f"HuggingFace error: {resp.text}")
+        # Non-retryable error
+        raise HTTPException(status_code=resp.status_code, detail=f"HuggingFace error: {resp.text}")
+
+    if not resp.headers.get("content-type", "").startswith("text/event-stream"):
+        # Not every model streams; a plain JSON reply arrives as a single piece
+        await resp.aread()
+        await resp.aclose()
+        text = _parse_huggingface_reply(resp)
 
+        async def _single():
+            yield text
+
+        return _single()
+
+    async def _pieces():
         try:
-            data = resp.json()
-        except Exception:
-            # Fallback to raw text
-            return (resp.text or "").strip()
-
-        # Response formats: list of {generated_text: ...} or dicts
-        if isinstance(data, list) and data and isinstance(data[0], dict) and "generated_text" in data[0]:
-            return (data[0]["generated_text"] or "").strip()
-        if isinstance(data, dict) and "generated_text" in data:
-            return (data["generated_text"] or "").strip()
-
-        # Some models return a list of tokens or alternative fields; fallback to string conversion
-        return (str(data) or "").strip()
-
-    @retry(
-        retry=retry_if_exception(_is_rate_limit_error),
-        wait=wait_random_exponential(multiplier=2, max=60),
-        stop=stop_after_attempt(5),
-        reraise=True,
+            # Server-sent events: `data: {"token": {"text": ..., "special": ...}, ...}`
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    event = json.loads(line[len("data:"):])
+                except ValueError:
+                    continue
+                if "error" in event:
+                    raise RuntimeError(f"HuggingFace stream error: {event['error']}")
+                token = event.get("token") or {}
+                if not token.get("special"):
+                    yield token.get("text") or ""
+        finally:
+            await resp.aclose()
+
+    return _pieces()
+
+@retry(
+    retry=retry_if_exception(_is_rate_limit_error),
+    wait=wait_random_exponential(multiplier=2, max=60),
+    stop=stop_after_attempt(5),
+    reraise=True,
+)
+async def _stream_with_openai_like(p: str, api_key: str, base_url: str, model_name: str, headers: Optional[dict] = None) -> AsyncIterator[str]:
+    client = get_openai_client(api_key, base_url, headers)
+    stream = await client.chat.completions.create(
+        model=model_name,
+        messages=[
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": p},
+        ],
+        temperature=0.7,
+        stream=True,
+    )
+
+    async def _pieces():
+        try:
+            async for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+        finally:
+            # Release the connection back to the shared pool
+            await stream.close()
+
+    return _pieces()
+
+async def _first_piece(pieces: AsyncIterator[str]) -> Optional[str]:
+    async for piece in pieces:
+        if piece.strip():
+            return piece
+    return None
+
+async def _prepend(first: str, rest: AsyncIterator[str]) -> AsyncIterator[str]:
+    yield first
+    async for piece in rest:
+        yield piece
+
+async def generate_latex_resume(cv_text: str, job_description: str) -> AsyncIterator[str]:
+    """
+    Generate adapted LaTeX resume using selected provider with fallbacks.
+    Supported providers: huggingface, openai, deepseek, grok (xAI). Configure with env vars.
+    Returns an async iterator of LaTeX text pieces as the model streams them. Providers are
+    tried in order until one produces its first token, so failures surface before streaming starts.
+    """
+
+    prompt = build_prompt(
+        truncate_to_token_budget(cv_text, CV_TOKEN_BUDGET),
+        truncate_to_token_budget(job_description, JOB_DESCRIPTION_TOKEN_BUDGET),
     )
-    def _generate_with_openai_like(p: str, api_key: str, base_url: str, model_name: str):
-        client = OpenAI(api_key=api_key, base_url=base_url)
-        chat = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": "You are an expert resume writer and LaTeX specialist."},
-                {"role": "user", "content": p},
-            ],
-            temperature=0.7,
-        )
-        return (chat.choices[0].message.content or "").strip()
 
     providers_order = [p.strip().lower() for p in os.getenv("PROVIDER_ORDER", "huggingface,openrouter,openai,deepseek,grok").split(",")]
 
@@ -205,7 +567,7 @@ def generate_latex_resume(cv_text: str, job_description: str) -> str:
                 if not os.getenv("HUGGINGFACE_API_KEY"):
                     print(f"[DEBUG] Skipping {provider}: no API key")
                     continue
-                latex_code = _generate_with_huggingface(prompt)
+                pieces = await _stream_with_huggingface(prompt)
             elif provider in ("openrouter", "openai", "deepseek", "grok"):
                 if provider == "openrouter":
                     api_key = os.getenv("OPENROUTER_API_KEY")
@@ -236,19 +598,17 @@ def generate_latex_resume(cv_text: str, job_description: str) -> str:
                     print(f"[DEBUG] Skipping {provider}: no API key")
                     continue
 
-                latex_code = _generate_with_openai_like(prompt, api_key, base_url, model_name, headers)
+                pieces = await _stream_with_openai_like(prompt, api_key, base_url, model_name, headers)
             else:
                 continue
 
-            # Remove markdown code blocks if present
-            if latex_code.startswith("```latex"):
-                latex_code = latex_code.replace("```latex", "").replace("```", "").strip()
-            elif latex_code.startswith("```"):
-                latex_code = latex_code.replace("```", "").strip()
-
-            if latex_code:
-                print(f"[DEBUG] Successfully generated with {provider}")
-                return latex_code
+            # Wait for the first real content after fence stripping, so an empty, fence-only or
+            # failing stream falls through to the next provider
+            pieces = _strip_code_fences_stream(pieces)
+            first = await _first_piece(pieces)
+            if first is not None:
+                print(f"[DEBUG] Streaming from {provider}")
+                return _prepend(first, pieces)
             last_error = ValueError("Empty response from model")
             print(f"[DEBUG] {provider} returned empty response")
         except Exception as e:
@@ -270,39 +630,215 @@ async def root():
 @app.post("/generate-resume")
 async def generate_resume(
     cv_file: UploadFile = File(...),
-    job_url: str = Form(...)
+    job_url: str = Form(...),
+    use_cache: bool = Form(True)
 ):
     """
     Main endpoint to generate adapted resume
+    Set use_cache to false to force a fresh draft instead of a cached one.
     """
     try:
         # Validate file type
         if not cv_file.filename.endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
         
-        # Extract text from CV
+        # Extract text from CV and fetch job description concurrently
         pdf_content = await cv_file.read()
-        cv_text = extract_text_from_pdf(pdf_content)
+        cv_hash = hashlib.sha256(pdf_content).hexdigest()
+        cv_text, job_description = await asyncio.gather(
+            extract_cv_text(pdf_content, cv_hash),
+            fetch_linkedin_job_description(job_url),
+        )
         
         print(f"[DEBUG] Extracted CV text length: {len(cv_text.strip())} characters")
         if not cv_text or len(cv_text.strip()) < 100:
             raise HTTPException(status_code=400, detail=f"Could not extract sufficient text from PDF. Extracted {len(cv_text.strip()) if cv_text else 0} characters. Ensure the PDF is text-based (not scanned).")
         
-        # Fetch job description
-        job_description = fetch_linkedin_job_description(job_url)
-        
         if len(job_description.strip()) < 50:
             raise HTTPException(status_code=400, detail="Could not extract sufficient job description")
         
-        # Generate LaTeX resume directly with Gemini
-        latex_code = generate_latex_resume(cv_text, job_description)
+        # Reuse a previous generation for a near-identical request if possible. If nothing is
+        # cached for this CV there is nothing to match, so embedding waits until after the response.
+        request_vec = None
+        if use_cache and semantic_cache_has_cv(cv_hash):
+            request_vec = await embed_for_semantic_cache(job_description)
+            latex_code = semantic_cache_lookup(cv_hash, request_vec) if request_vec is not None else None
+            if latex_code is not None:
+                print("[DEBUG] Semantic cache hit")
+                return PlainTextResponse(latex_code)
+
+        # Stream the LaTeX back as it is generated; the cache is filled after the response completes
+        pieces = await generate_latex_resume(cv_text, job_description)
+        parts = []
+        completed = False
+
+        async def _stream():
+            nonlocal completed
+            async for piece in pieces:
+                parts.append(piece)
+                yield piece
+            completed = True
+
+        async def _fill_cache():
+            latex_code = "".join(parts)
+            # Skip interrupted streams, and never cache an empty result; it would be served to
+            # every matching request
+            if not completed or not latex_code.strip():
+                return
+            vec = request_vec if request_vec is not None else await embed_for_semantic_cache(job_description)
+            if vec is not None:
+                semantic_cache_add(cv_hash, vec, latex_code)
+
+        return StreamingResponse(
+            _stream(),
+            media_type="text/plain; charset=utf-8",
+            # Ask reverse proxies not to buffer the stream
+            headers={"X-Accel-Buffering": "no"},
+            background=BackgroundTask(_fill_cache),
+        )
         
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def _get_batch_client() -> AsyncOpenAI:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=503, detail="Bulk generation requires OPENAI_API_KEY")
+    return get_openai_client(api_key, os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"))
+
+@app.post("/generate-resumes")
+async def generate_resumes(
+    cv_file: UploadFile = File(...),
+    job_urls: List[str] = Form(...)
+):
+    """
+    Submit one CV against many job URLs as an OpenAI batch.
+    Batches complete asynchronously (within 24h); poll GET /generate-resumes/{batch_id} for results.
+    """
+    try:
+        if not cv_file.filename.endswith('.pdf'):
+            raise HTTPException(status_code=400, detail="Only PDF files are supported")
+        if len(job_urls) > MAX_BATCH_JOB_URLS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_JOB_URLS} job URLs are supported per batch")
+
+        client = _get_batch_client()
+
+        pdf_content = await cv_file.read()
+        cv_hash = hashlib.sha256(pdf_content).hexdigest()
+        cv_text, *job_descriptions = await asyncio.gather(
+            extract_cv_text(pdf_content, cv_hash),
+            *(fetch_linkedin_job_description(url) for url in job_urls),
+            return_exceptions=True,
+        )
+        if isinstance(cv_text, Exception):
+            raise cv_text
+        if not cv_text or len(cv_text.strip()) < 100:
+            raise HTTPException(status_code=400, detail=f"Could not extract sufficient text from PDF. Extracted {len(cv_text.strip()) if cv_text else 0} characters. Ensure the PDF is text-based (not scanned).")
+
+        # The CV is the same for every job, so tokenize and truncate it once
+        cv_text = truncate_to_token_budget(cv_text, CV_TOKEN_BUDGET)
+
+        # Skip URLs whose description couldn't be fetched; report them instead of failing the batch
+        jobs = []
+        errors = []
+        lines = []
+        model_name = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        for job_url, job_description in zip(job_urls, job_descriptions):
+            if isinstance(job_description, Exception):
+                detail = job_description.detail if isinstance(job_description, HTTPException) else str(job_description)
+                errors.append({"job_url": job_url, "error": detail})
+                continue
+            if len(job_description.strip()) < 50:
+                errors.append({"job_url": job_url, "error": "Could not extract sufficient job description"})
+                continue
+
+            custom_id = str(len(jobs))
+            jobs.append({"custom_id": custom_id, "job_url": job_url})
+            lines.append(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": model_name,
+                    "messages": [
+                        {"role": "system", "content": SYSTEM_MESSAGE},
+                        {"role": "user", "content": build_prompt(cv_text, truncate_to_token_budget(job_description, JOB_DESCRIPTION_TOKEN_BUDGET))},
+                    ],
+                    "temperature": 0.7,
+                },
+            }))
+
+        if not jobs:
+            raise HTTPException(status_code=400, detail="Could not extract a job description from any of the URLs")
+
+        batch_input = await client.files.create(
+            file=("resumes.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = await client.batches.create(
+            input_file_id=batch_input.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        print(f"[DEBUG] Submitted batch {batch.id} with {len(jobs)} requests")
+
         return {
             "success": True,
-            "latex_code": latex_code,
-            "message": "Resume generated successfully"
+            "batch_id": batch.id,
+            "status": batch.status,
+            "jobs": jobs,
+            "errors": errors,
         }
-        
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.get("/generate-resumes/{batch_id}")
+async def get_generated_resumes(batch_id: str):
+    """
+    Report the status of a bulk generation batch, with per-request LaTeX once it has completed
+    """
+    try:
+        client = _get_batch_client()
+        batch = await client.batches.retrieve(batch_id)
+        response = {
+            "batch_id": batch.id,
+            "status": batch.status,
+            "request_counts": batch.request_counts.model_dump() if batch.request_counts else None,
+        }
+        if batch.status != "completed":
+            return response
+
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await client.files.content(file_id)
+            for line in content.text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                body = (record.get("response") or {}).get("body") or {}
+                choices = body.get("choices") or []
+                latex_code = strip_code_fences(choices[0]["message"]["content"] or "") if choices else ""
+                if record.get("error") or not latex_code:
+                    results[record["custom_id"]] = {
+                        "custom_id": record["custom_id"],
+                        "error": record.get("error") or body.get("error") or "Empty response from model",
+                    }
+                    continue
+                results[record["custom_id"]] = {
+                    "custom_id": record["custom_id"],
+                    "latex_code": latex_code,
+                }
+
+        response["results"] = sorted(results.values(), key=lambda r: int(r["custom_id"]))
+        return response
+
     except HTTPException as he:
         raise he
     except Exception as e:
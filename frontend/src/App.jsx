@@ -12,6 +12,8 @@ function App() {
   const [error, setError] = useState('')
   const [retrySeconds, setRetrySeconds] = useState(0)
   const [autoRetry, setAutoRetry] = useState(false)
+  // Inputs of the last successful generation; generating again with the same ones asks for a fresh draft
+  const [lastGenerated, setLastGenerated] = useState(null)
 
   useEffect(() => {
     if (retrySeconds <= 0) return
@@ -60,6 +62,8 @@ function App() {
       const formData = new FormData()
       formData.append('cv_file', cvFile)
       formData.append('job_url', jobUrl)
+      const isRegenerate = lastGenerated?.cvFile === cvFile && lastGenerated?.jobUrl === jobUrl
+      formData.append('use_cache', isRegenerate ? 'false' : 'true')
 
       const response = await fetch('/api/generate-resume', {
         method: 'POST',
@@ -71,8 +75,22 @@ function App() {
         throw new Error(errorData.detail || 'Failed to generate resume')
       }
 
-      const data = await response.json()
-      setLatexCode(data.latex_code)
+      // The backend streams LaTeX as plain text; render it as it arrives
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let text = ''
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        text += decoder.decode(value, { stream: true })
+        setLatexCode(text)
+      }
+      text += decoder.decode()
+      if (!text.trim()) {
+        throw new Error('The model returned an empty resume. Please try again.')
+      }
+      setLatexCode(text)
+      setLastGenerated({ cvFile, jobUrl })
     } catch (err) { 
       const msg = err.message || 'An error occurred while generating the resume'
       setError(msg)